@@ -1,18 +1,66 @@
 import os
 import sqlite3
 import json
+import hashlib
+import functools
 import logging
-from openai import OpenAI
+import asyncio
+import argparse
+from datetime import datetime, timezone
+import aiohttp
+import tiktoken
+from openai import AsyncOpenAI, RateLimitError
 from dotenv import load_dotenv
-from serpapi import GoogleSearch # Import the search library
+from database_setup import configure_connection
 
 # --- Configuration ---
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DB_PATH = 'stock_news.db'
-OPENAI_MODEL = "gpt-4-turbo"
+OPENAI_MODEL = "gpt-4o-mini"
+FALLBACK_MODEL = "gpt-4o"  # Re-runs answers the cheap model isn't confident about
+CONFIDENCE_THRESHOLD = 7  # Escalate to FALLBACK_MODEL below this confidence
 ALLOWED_EVALUATIONS = {"Bullish", "Bearish", "Neutral"}
+SERPAPI_URL = "https://serpapi.com/search.json"
+MAX_CONCURRENT_REQUESTS = 20  # Articles in flight at once
+MAX_RETRIES = 5  # Attempts per OpenAI call on rate limiting
+ARTICLE_TOKEN_BUDGET = 6000  # Max article tokens sent to the LLM
+UPDATE_BATCH_SIZE = 50  # Analyses buffered per DB transaction
+BATCH_INPUT_PATH = 'batch_input.jsonl'
+BATCH_POLL_SECS = 60
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Structured-outputs schema matching the JSON structure described in the prompt.
+# With strict mode the API guarantees responses conform to it.
+ANALYSIS_SCHEMA = {
+    "name": "article_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "evaluation": {"type": "string", "enum": sorted(ALLOWED_EVALUATIONS)},
+            "timescale": {
+                "type": "string",
+                "enum": ["Intraday (1 day)", "Short-term (1-4 weeks)", "Medium-term (1-6 months)"],
+            },
+            "magnitude": {"type": "string", "enum": ["Low (<2%)", "Medium (2-5%)", "High (>5%)"]},
+            "reasoning": {
+                "type": "object",
+                "properties": {
+                    "bullish_drivers": {"type": "array", "items": {"type": "string"}},
+                    "bearish_drivers": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["bullish_drivers", "bearish_drivers"],
+                "additionalProperties": False,
+            },
+            "confidence": {"type": "integer"},
+            "confidence_reasoning": {"type": "string"},
+        },
+        "required": ["evaluation", "timescale", "magnitude", "reasoning", "confidence", "confidence_reasoning"],
+        "additionalProperties": False,
+    },
+}
 
 # --- Client Initialization ---
 # OpenAI Client
@@ -20,7 +68,7 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     logging.error("No OPENAI_API_KEY found in .env file.")
     raise ValueError("OPENAI_API_KEY is not set.")
-client = OpenAI(api_key=openai_api_key)
+client = AsyncOpenAI(api_key=openai_api_key)
 
 # SerpApi Client
 serpapi_api_key = os.getenv("SERPAPI_API_KEY")
@@ -32,21 +80,43 @@ if not serpapi_api_key:
 
 def get_db_connection():
     """Establishes and returns a database connection."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = configure_connection(sqlite3.connect(DB_PATH))
     conn.row_factory = sqlite3.Row
     return conn
 
-def perform_web_search(query, num_results=3):
+def prompt_hash(prompt):
+    """Returns the cache key for a prompt. The primary model is part of the key."""
+    return hashlib.sha256(f"{OPENAI_MODEL}\n{prompt}".encode()).hexdigest()
+
+def get_cached_response(conn, key):
+    """Returns the cached LLM response for a prompt hash, or None on a miss."""
+    row = conn.execute("SELECT response_json FROM llm_cache WHERE prompt_hash = ?", (key,)).fetchone()
+    return row['response_json'] if row else None
+
+def store_cached_response(conn, key, content):
+    """Stores an LLM response in the cache."""
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO llm_cache (prompt_hash, response_json) VALUES (?, ?)",
+                (key, content)
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Database error caching LLM response: {e}")
+
+async def perform_web_search(session, query, num_results=3):
     """Performs a web search using SerpApi and returns top results."""
     logging.info(f"Performing web search for: '{query}'")
     try:
         params = {
+            "engine": "google",
             "q": query,
             "api_key": serpapi_api_key,
             "num": num_results
         }
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        async with session.get(SERPAPI_URL, params=params) as resp:
+            resp.raise_for_status()
+            results = await resp.json()
         
         # Extract relevant organic results
         organic_results = results.get("organic_results", [])
@@ -62,9 +132,56 @@ def perform_web_search(query, num_results=3):
         logging.error(f"Error during web search for '{query}': {e}")
         return [] # Return empty list on error to not halt the process
 
+# In-flight searches for this run, keyed by (query, day), so concurrent articles
+# about the same company share a single SerpApi request.
+_search_tasks = {}
+
+async def _search_with_db_cache(session, conn, query, day):
+    """Returns search results from the search_cache table, falling back to SerpApi."""
+    row = conn.execute(
+        "SELECT results_json FROM search_cache WHERE query = ? AND day = ?", (query, day)
+    ).fetchone()
+    if row:
+        logging.info(f"Search cache hit for: '{query}'")
+        return json.loads(row['results_json'])
+
+    results = await perform_web_search(session, query)
+    if results: # Don't cache failures or empty results
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (query, day, results_json) VALUES (?, ?, ?)",
+                    (query, day, json.dumps(results))
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Database error caching search results for '{query}': {e}")
+    return results
+
+async def cached_web_search(session, conn, query):
+    """Performs a web search at most once per query and UTC day."""
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    key = (query, day)
+    if key not in _search_tasks:
+        _search_tasks[key] = asyncio.ensure_future(_search_with_db_cache(session, conn, query, day))
+    return await _search_tasks[key]
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    """The model's tokenizer, loaded on first use (the first load downloads its BPE file)."""
+    return tiktoken.encoding_for_model(OPENAI_MODEL)
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text down to at most max_tokens tokens of the model's encoding."""
+    encoding = _encoding()
+    tokens = encoding.encode(text or "")
+    if len(tokens) <= max_tokens:
+        return text or ""
+    return encoding.decode(tokens[:max_tokens]) + "\n[... truncated]"
+
 # The prompt function is now the advanced version
 def build_advanced_prompt(article_title, article_text, company_name, search_results):
     """Builds an advanced prompt for the LLM, incorporating web search results."""
+    article_text = truncate_to_tokens(article_text, ARTICLE_TOKEN_BUDGET)
     formatted_search_results = "\n\n".join(
         [f"Source {i+1}: {res['title']}\n{res['snippet']}" for i, res in enumerate(search_results)]
     )
@@ -111,94 +228,303 @@ Based on all the information above, provide a structured financial assessment. Y
 Begin your analysis now.
 """
 
-def update_article_analysis_advanced(conn, article_id, analysis_json):
-    """Updates the article in the DB, storing the entire JSON analysis."""
+def update_article_analysis_advanced(conn, pending_updates, article_id, analysis_json):
+    """Buffers the article's analysis, flushing to the DB once UPDATE_BATCH_SIZE updates are pending."""
+    pending_updates.append((
+        analysis_json.get("evaluation"),
+        analysis_json.get("confidence"),
+        # Store the full response compactly. The reasoning object lives inside it;
+        # read it with json_extract(llm_full_response, '$.reasoning').
+        json.dumps(analysis_json, separators=(",", ":")),
+        article_id,
+    ))
+    if len(pending_updates) >= UPDATE_BATCH_SIZE:
+        flush_analysis_updates(conn, pending_updates)
+
+def flush_analysis_updates(conn, pending_updates):
+    """Writes all buffered analyses to the DB in a single transaction."""
+    if not pending_updates:
+        return
     try:
         with conn:
-            conn.execute(
+            conn.executemany(
                 """
                 UPDATE articles
                 SET llm_evaluation = ?, 
-                    llm_reasoning = ?, 
                     llm_confidence = ?, 
                     processing_status = 'processed',
                     llm_full_response = ?
                 WHERE id = ?
                 """,
-                (
-                    analysis_json.get("evaluation"),
-                    json.dumps(analysis_json.get("reasoning")), # Store the reasoning object as a JSON string
-                    analysis_json.get("confidence"),
-                    json.dumps(analysis_json), # Store the full response
-                    article_id,
-                )
+                pending_updates
             )
-        logging.info(f"Successfully updated article ID {article_id} with advanced analysis.")
+        logging.info(f"Successfully updated {len(pending_updates)} articles with advanced analysis.")
     except sqlite3.Error as e:
-        logging.error(f"Database error updating article ID {article_id}: {e}")
+        article_ids = [row[-1] for row in pending_updates]
+        logging.error(f"Database error updating article IDs {article_ids}: {e}")
+    finally:
+        pending_updates.clear()
 
 # This assumes your 'articles' table has a new column: llm_full_response TEXT
 # You might need to run this SQL command once on your DB:
 # ALTER TABLE articles ADD COLUMN llm_full_response TEXT;
 
 
-def main():
-    """Main function to fetch, search, analyze, and update articles."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, article_text, company_name FROM articles WHERE processing_status = 'pending'")
-    # We now assume a 'company_name' column exists.
-    pending_articles = cursor.fetchall()
+def build_completion_body(prompt, model=OPENAI_MODEL):
+    """Builds the chat completion request body shared by the realtime and batch paths."""
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_schema", "json_schema": ANALYSIS_SCHEMA},
+    }
 
-    if not pending_articles:
-        logging.info("No pending articles found.")
-        conn.close()
-        return
+def parse_analysis(article_id, content):
+    """Parses the LLM response, returning None if it is unusable."""
+    # The schema guarantees the structure; content is only missing on a refusal.
+    if content is None:
+        logging.warning(f"Article ID {article_id}: Model refused to answer.")
+        return None
+    return json.loads(content)
 
-    logging.info(f"Found {len(pending_articles)} pending articles.")
+async def call_llm(prompt, model=OPENAI_MODEL):
+    """Calls the LLM, retrying with exponential backoff when rate limited."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = await client.chat.completions.create(**build_completion_body(prompt, model))
+            return response.choices[0].message.content
+        except RateLimitError:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = 2 ** attempt
+            logging.warning(f"Rate limited by OpenAI, retrying in {delay}s...")
+            await asyncio.sleep(delay)
 
-    for row in pending_articles:
-        article_id = row['id']
-        title = row['title']
-        company_name = row.get('company_name') # Get company name from the row
+async def escalate_if_unsure(article_id, prompt, content, result_json):
+    """Re-runs a low-confidence answer on FALLBACK_MODEL. Returns the (content, result_json) to keep."""
+    if result_json["confidence"] >= CONFIDENCE_THRESHOLD:
+        return content, result_json
+    logging.info(
+        f"Article ID {article_id}: confidence {result_json['confidence']} is below "
+        f"{CONFIDENCE_THRESHOLD}, re-running with {FALLBACK_MODEL}."
+    )
+    fallback_content = await call_llm(prompt, FALLBACK_MODEL)
+    fallback_json = parse_analysis(article_id, fallback_content)
+    if fallback_json is None:
+        return content, result_json
+    return fallback_content, fallback_json
 
-        if not company_name:
-            logging.warning(f"Skipping article ID {article_id} due to missing company name.")
-            continue
-            
-        logging.info(f"Processing article ID {article_id} for company: {company_name}")
+async def prepare_prompt(session, conn, row):
+    """Runs the web search for an article and builds its prompt. Returns None if the article can't be analyzed."""
+    article_id = row['id']
+    company_name = row['company_name'] # Get company name from the row
 
-        # Step 1: Perform web search
-        search_query = f"{company_name} stock news"
-        search_results = perform_web_search(search_query)
+    if not company_name:
+        logging.warning(f"Skipping article ID {article_id} due to missing company name.")
+        return None
 
-        # Step 2: Build the advanced prompt
-        prompt = build_advanced_prompt(title, row['article_text'], company_name, search_results)
+    logging.info(f"Processing article ID {article_id} for company: {company_name}")
 
-        # Step 3: Call the LLM
+    # Step 1: Perform web search
+    search_query = f"{company_name} stock news"
+    search_results = await cached_web_search(session, conn, search_query)
+
+    # Step 2: Build the advanced prompt
+    return build_advanced_prompt(row['title'], row['article_text'], company_name, search_results)
+
+async def process_article(sem, session, conn, row, results_queue):
+    """Searches, prompts and analyzes a single article, queueing the result for the DB writer."""
+    article_id = row['id']
+    async with sem:
         try:
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
+            prompt = await prepare_prompt(session, conn, row)
+            if prompt is None:
+                return
+
+            # Step 3: Call the LLM, unless this exact prompt has been answered before
+            key = prompt_hash(prompt)
+            content = get_cached_response(conn, key)
+            cache_hit = content is not None
+            if cache_hit:
+                logging.info(f"Article ID {article_id}: LLM cache hit.")
+            else:
+                content = await call_llm(prompt)
+            result_json = parse_analysis(article_id, content)
+            if result_json is None:
+                return
+            if not cache_hit:
+                try:
+                    content, result_json = await escalate_if_unsure(article_id, prompt, content, result_json)
+                except Exception as e:
+                    logging.error(f"Article ID {article_id}: fallback failed, keeping primary answer: {e}")
+                store_cached_response(conn, key, content)
+
+            # Step 4: Hand the result to the DB writer
+            await results_queue.put((article_id, result_json))
+
+        except Exception as e:
+            logging.error(f"An unexpected error occurred for article ID {article_id}: {e}")
+
+async def db_writer(conn, pending_updates, results_queue):
+    """Single writer that drains analysis results into the DB, avoiding sqlite contention."""
+    while True:
+        item = await results_queue.get()
+        if item is None:
+            break
+        article_id, result_json = item
+        update_article_analysis_advanced(conn, pending_updates, article_id, result_json)
+
+async def process_articles(conn, pending_updates, pending_articles):
+    """Runs all pending articles concurrently, bounded by MAX_CONCURRENT_REQUESTS."""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    results_queue = asyncio.Queue()
+    writer = asyncio.create_task(db_writer(conn, pending_updates, results_queue))
+    try:
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(
+                *(process_article(sem, session, conn, row, results_queue) for row in pending_articles)
             )
-            content = response.choices[0].message.content
-            result_json = json.loads(content)
+    finally:
+        await results_queue.put(None)
+        await writer
+
+# --- Batch API path ---
+
+async def collect_prompts(conn, pending_articles):
+    """Builds prompts for all pending articles concurrently. Returns a list of (article_id, prompt)."""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def bounded(session, row):
+        async with sem:
+            try:
+                return row['id'], await prepare_prompt(session, conn, row)
+            except Exception as e:
+                logging.error(f"An unexpected error occurred for article ID {row['id']}: {e}")
+                return row['id'], None
+
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*(bounded(session, row) for row in pending_articles))
+    return [(article_id, prompt) for article_id, prompt in results if prompt is not None]
+
+def write_batch_file(prompts, path=BATCH_INPUT_PATH):
+    """Writes one Batch API request per line, keyed by article ID."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for article_id, prompt in prompts:
+            request = {
+                "custom_id": str(article_id),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": build_completion_body(prompt),
+            }
+            f.write(json.dumps(request) + "\n")
+    return path
 
-            # A simple validation could be to check for the top-level keys
-            required_keys = {"evaluation", "timescale", "magnitude", "reasoning", "confidence", "confidence_reasoning"}
-            if not required_keys.issubset(result_json.keys()):
-                 logging.warning(f"Article ID {article_id}: Response missing required keys.")
-                 continue
+async def run_batch(conn, pending_updates, pending_articles):
+    """Submits all pending articles through the OpenAI Batch API and applies the results."""
+    prompts = await collect_prompts(conn, pending_articles)
 
-            # Step 4: Update the database
-            update_article_analysis_advanced(conn, article_id, result_json)
+    # Answer what we can from the cache and only submit the misses
+    keys = {}
+    misses = []
+    for article_id, prompt in prompts:
+        key = prompt_hash(prompt)
+        content = get_cached_response(conn, key)
+        if content is None:
+            keys[article_id] = key
+            misses.append((article_id, prompt))
+            continue
+        logging.info(f"Article ID {article_id}: LLM cache hit.")
+        result_json = parse_analysis(article_id, content)
+        if result_json is not None:
+            update_article_analysis_advanced(conn, pending_updates, article_id, result_json)
+    prompts = misses
+
+    if not prompts:
+        logging.info("No articles to submit.")
+        return
+
+    path = write_batch_file(prompts)
+    with open(path, 'rb') as f:
+        batch_file = await client.files.create(file=f, purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    logging.info(f"Submitted batch {batch.id} with {len(prompts)} requests.")
 
+    while batch.status not in BATCH_FINAL_STATUSES:
+        await asyncio.sleep(BATCH_POLL_SECS)
+        batch = await client.batches.retrieve(batch.id)
+        logging.info(f"Batch {batch.id} status: {batch.status}")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        logging.error(f"Batch {batch.id} finished with status '{batch.status}'.")
+        return
+
+    output = await client.files.content(batch.output_file_id)
+    answered = []
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        article_id = int(result["custom_id"])
+        try:
+            if result.get("error") or result["response"]["status_code"] != 200:
+                logging.error(f"Article ID {article_id}: batch request failed: {result.get('error')}")
+                continue
+            content = result["response"]["body"]["choices"][0]["message"]["content"]
+            result_json = parse_analysis(article_id, content)
+            if result_json is not None:
+                answered.append((article_id, content, result_json))
         except Exception as e:
             logging.error(f"An unexpected error occurred for article ID {article_id}: {e}")
 
-    conn.close()
+    # Low-confidence answers are re-run in realtime on the fallback model
+    prompt_by_id = dict(prompts)
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def finish(article_id, content, result_json):
+        async with sem:
+            try:
+                content, result_json = await escalate_if_unsure(
+                    article_id, prompt_by_id[article_id], content, result_json
+                )
+            except Exception as e:
+                logging.error(f"Article ID {article_id}: fallback failed, keeping batch answer: {e}")
+        store_cached_response(conn, keys[article_id], content)
+        update_article_analysis_advanced(conn, pending_updates, article_id, result_json)
+
+    await asyncio.gather(*(finish(*item) for item in answered))
+
+def main(batch=False):
+    """Main function to fetch, search, analyze, and update articles."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, title, article_text, company_name FROM articles WHERE processing_status = 'pending'")
+    # We now assume a 'company_name' column exists.
+    pending_articles = cursor.fetchall()
+
+    if not pending_articles:
+        logging.info("No pending articles found.")
+        conn.close()
+        return
+
+    logging.info(f"Found {len(pending_articles)} pending articles.")
+
+    pending_updates = []
+    try:
+        if batch:
+            asyncio.run(run_batch(conn, pending_updates, pending_articles))
+        else:
+            asyncio.run(process_articles(conn, pending_updates, pending_articles))
+    finally:
+        flush_analysis_updates(conn, pending_updates)
+        conn.close()
     logging.info("Processing complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyze pending articles with an LLM.")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit articles through the OpenAI Batch API (cheaper, results within 24h).")
+    args = parser.parse_args()
+    main(batch=args.batch)
\ No newline at end of file
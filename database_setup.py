@@ -4,6 +4,20 @@ import sqlite3
 # It will be created in the same directory as the script.
 DATABASE_FILE = "stock_news.db"
 
+def configure_connection(conn):
+    """
+    Applies the performance pragmas we want on every connection.
+    WAL lets the scraper write while the analysis script reads, and
+    synchronous=NORMAL avoids an fsync on every commit (safe under WAL).
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB memory map
+    conn.execute("PRAGMA busy_timeout=5000")  # Wait up to 5s on a locked DB
+    return conn
+
 def create_database_and_table():
     """
     Connects to the SQLite database (creating it if it doesn't exist)
@@ -17,6 +31,11 @@ def create_database_and_table():
         cursor = conn.cursor()
         print("Database created and successfully connected to SQLite.")
 
+        # Switch to WAL journaling. Unlike most pragmas this one is stored in
+        # the database file, so it persists for every future connection.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        print("Journal mode set to WAL.")
+
         # 2. Define the SQL command to create the 'articles' table.
         # We use triple quotes for a multi-line string.
         sql_create_articles_table = """
@@ -39,14 +58,49 @@ def create_database_and_table():
         cursor.execute(sql_create_articles_table)
         print("Table 'articles' created or already exists.")
 
-        # 4. Commit the changes to the database.
+        # Index the status column so the analysis script's "pending" lookup
+        # doesn't scan the whole table (including the large text columns).
+        # The partial index only holds pending rows, so it stays small.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_status ON articles(processing_status);")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_pending ON articles(processing_status, id) "
+            "WHERE processing_status = 'pending';"
+        )
+        cursor.execute("ANALYZE articles;")
+        print("Indexes on 'articles' created or already exist.")
+
+        # 4. Create the 'llm_cache' table, which stores LLM responses keyed by
+        # the SHA-256 hash of the prompt so identical prompts are never re-sent.
+        sql_create_llm_cache_table = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            prompt_hash TEXT PRIMARY KEY,
+            response_json TEXT NOT NULL
+        );
+        """
+        cursor.execute(sql_create_llm_cache_table)
+        print("Table 'llm_cache' created or already exists.")
+
+        # 5. Create the 'search_cache' table, which stores web search results
+        # per query and UTC day so repeated queries don't burn SerpApi quota.
+        sql_create_search_cache_table = """
+        CREATE TABLE IF NOT EXISTS search_cache (
+            query TEXT NOT NULL,
+            day TEXT NOT NULL,
+            results_json TEXT NOT NULL,
+            PRIMARY KEY (query, day)
+        );
+        """
+        cursor.execute(sql_create_search_cache_table)
+        print("Table 'search_cache' created or already exists.")
+
+        # 6. Commit the changes to the database.
         # This saves the table structure.
         conn.commit()
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
     finally:
-        # 5. Close the connection.
+        # 7. Close the connection.
         # It's important to close the connection, whether an error occurred or not.
         if conn:
             conn.close()
@@ -12,25 +12,45 @@ For every article across all pages:
 
 → Run with:
     python selenium_open_page.py "https://www.saudiexchange.sa/wps/portal/saudiexchange/newsandreports" --show
+    Add --workers=N to change how many articles are scraped in parallel.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Set, Tuple, Optional
+from dataclasses import dataclass, asdict
 import sys
 import os
+import atexit
 import re
+import hashlib
+import shutil
+import uuid
+import threading
+import multiprocessing
+from queue import Queue
+import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from urllib.parse import urljoin, urlparse, unquote
+from urllib.parse import urljoin, urlparse, urlunparse, unquote
 from datetime import datetime
+from email.utils import formatdate
 
 ## NEW: Imports for database and text extraction
 import sqlite3
-import PyPDF2
+import pymupdf
 import docx
 import openpyxl
+import lxml.html
+import trafilatura
+from database_setup import configure_connection
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -45,18 +65,161 @@ USER_AGENT = (
 )
 WAIT_SECS = 25
 BASE_URL = "https://www.saudiexchange.sa"
+# Phrases of the WAF block pages, which are served with HTTP 200
+BLOCKED_PAGE_MARKERS = ("access denied", "request rejected")
+# Resources the scraper never uses; blocking them shrinks every page load
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.woff*", "*.ttf", "*.css",
+    "*google-analytics*", "*googletagmanager*", "*gtag*",
+]
 DOWNLOAD_DIR = Path("downloads")
 DOWNLOAD_DIR.mkdir(exist_ok=True) # Ensure download directory exists
+# Formats tried, in order, when turning an article's listed date into a folder name
+ARTICLE_DATE_FORMATS = ("%d/%m/%Y", "%Y/%m/%d", "%Y-%m-%d", "%d-%m-%Y")
+ARTICLE_DIR_NAME_MAX = 120  # Keep per-article folder names well under path limits
 
 ## NEW: Database file constant
 DATABASE_FILE = "stock_news.db"
+SCRAPE_WORKERS = 4  # Default article worker threads, each with its own Chrome
+INSERT_BATCH_SIZE = 25  # Articles per insert transaction
+_PENDING: List[Tuple[str, str, str, str, str]] = []  # Articles waiting to be inserted
+PAGE_DONE = object()  # Put on the results queue after each listing page to flush _PENDING
+
+_DL_EXTS = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip")
+# Returns the resolved href of every link whose path ends in one of the
+# extensions passed as arguments[0], so only attachments leave the browser.
+ATTACHMENT_LINKS_JS = """
+const exts = arguments[0];
+return Array.from(document.querySelectorAll('a[href]'), a => a.href).filter(h => {
+  try {
+    const path = new URL(h).pathname.toLowerCase();
+    return exts.some(ext => path.endsWith(ext));
+  } catch (e) {
+    return false;
+  }
+});
+"""
 
-DL_EXT_PATTERN = re.compile(r"\.(pdf|docx?|xlsx?|pptx?|zip)$", re.I)
+## File-name cleanup, built once: characters Windows rejects map to "_" in a
+## single translate pass, and whitespace runs collapse to one "_".
+_INVALID_CHARS = str.maketrans({c: "_" for c in '\\/:*?"<>|'})
+_WHITESPACE = re.compile(r"\s+")
+
+## Page-side extraction scripts: one execute_script call returns every field,
+## instead of one WebDriver round-trip per element.
+LIST_ITEMS_JS = """
+return Array.from(document.querySelectorAll('#announcementResultsDivId li')).map(li => ({
+  title: li.querySelector('h2')?.innerText.trim(),
+  date:  li.querySelector('div.date')?.innerText.trim(),
+  url:   li.parentElement.href  // resolved against the page URL, like ATTACHMENT_LINKS_JS
+}));
+"""
+PARAGRAPHS_JS = """
+const main = document.querySelectorAll('main p');
+const ps = main.length ? main : document.querySelectorAll('p');
+return Array.from(ps).map(p => p.innerText.trim()).filter(t => t);
+"""
+
+## Shared HTTP clients that reuse keep-alive connections. Attachments are plain
+## GET-to-disk downloads, so they skip the requests layer and use urllib3 directly;
+## the session is used for article pages.
+DOWNLOAD_WORKERS = 8
+## Every article worker runs its own DOWNLOAD_WORKERS threads against the same host,
+## so the pool holds one connection per thread; block=True makes any extra threads
+## (e.g. --workers above SCRAPE_WORKERS) wait for a free connection instead of
+## opening throwaway ones.
+_HTTP = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=SCRAPE_WORKERS * DOWNLOAD_WORKERS,
+    block=True,
+    headers={"User-Agent": USER_AGENT},
+    retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = USER_AGENT
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+## Worker processes for CPU-bound attachment parsing (PDF/DOCX/XLSX). They are
+## started from a fork server rather than forked from this process, which by then
+## runs Chrome/HTTP threads whose held locks a plain fork would copy. The pool is
+## created on first use: forkserver children re-import this module, and must not
+## each build a pool of their own.
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+def parse_pool() -> ProcessPoolExecutor:
+    """Returns the shared attachment-parsing pool, starting it on the first call."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _parse_pool
+
+def _replace_broken_parse_pool(broken: ProcessPoolExecutor) -> None:
+    """
+    Drops a pool whose worker died, so the next parse_pool() call starts a
+    fresh one. Only the pool the caller saw break is replaced, in case
+    another thread already swapped it.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is broken:
+            _parse_pool = None
+    broken.shutdown(wait=False)
+
+def shutdown_parse_pool() -> None:
+    """Stops the parsing pool, if it was ever started."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown()
+            _parse_pool = None
+
+@dataclass(slots=True, frozen=True)
+class Article:
+    """One entry from the announcements listing."""
+    date: str
+    title: str
+    url: str
 
 # ────────────────────────────────────────────────────────────────────────────────
-# Browser setup helpers (No changes here)
+# Browser setup helpers
 # ────────────────────────────────────────────────────────────────────────────────
 
+# Path to chromedriver, resolved once and shared by every driver we build.
+# Set CHROMEDRIVER to skip the lookup entirely (e.g. in CI).
+_driver_path: Optional[str] = os.environ.get("CHROMEDRIVER")
+# Chrome binary Selenium Manager picked for the first driver (it may download
+# Chrome for Testing when no browser is installed); empty means the default.
+_browser_path: str = ""
+_driver_path_lock = threading.Lock()
+
+def _start_chrome(opts: Options) -> webdriver.Chrome:
+    """
+    Starts Chrome, resolving chromedriver and the browser through Selenium
+    Manager only for the first driver; later drivers (e.g. one per article
+    worker) reuse both paths.
+    """
+    global _driver_path, _browser_path
+    if _driver_path is None:
+        with _driver_path_lock:
+            if _driver_path is None:
+                driver = webdriver.Chrome(options=opts)
+                _browser_path = opts.binary_location
+                _driver_path = driver.service.path
+                return driver
+    if _browser_path and not opts.binary_location:
+        opts.binary_location = _browser_path
+    return webdriver.Chrome(service=Service(executable_path=_driver_path), options=opts)
+
 def build_driver(headless: bool = True) -> webdriver.Chrome:
     opts = Options()
     if headless:
@@ -65,15 +228,20 @@ def build_driver(headless: bool = True) -> webdriver.Chrome:
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option("useAutomationExtension", False)
-    driver = webdriver.Chrome(options=opts)
+    # We only read text and links, so skip images and return once the DOM is ready
+    opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    opts.page_load_strategy = "eager"
+    driver = _start_chrome(opts)
     driver.execute_cdp_cmd(
         "Page.addScriptToEvaluateOnNewDocument",
         {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"},
     )
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
     return driver
 
 # ────────────────────────────────────────────────────────────────────────────────
-# Listing‑page helpers (No changes here)
+# Listing‑page helpers
 # ────────────────────────────────────────────────────────────────────────────────
 
 def click_period(driver: webdriver.Chrome, period_id: str = "1D") -> None:
@@ -111,25 +279,29 @@ def click_period(driver: webdriver.Chrome, period_id: str = "1D") -> None:
         # Re-raise the exception to halt the script, as it cannot proceed.
         raise
 
-def extract_list_items(driver: webdriver.Chrome) -> List[Dict[str, str]]:
+def extract_list_items(driver: webdriver.Chrome) -> List[Article]:
     try:
         WebDriverWait(driver, WAIT_SECS).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "#announcementResultsDivId li"))
         )
     except TimeoutException:
         return []
-    items: List[Dict[str, str]] = []
-    for li in driver.find_elements(By.CSS_SELECTOR, "#announcementResultsDivId li"):
-        try:
-            title = li.find_element(By.TAG_NAME, "h2").text.strip()
-            date_str = li.find_element(By.CSS_SELECTOR, "div.date").text.strip()
-            anchor = li.find_element(By.XPATH, "..")
-            href = urljoin(BASE_URL, anchor.get_attribute("href"))
-            items.append({"date": date_str, "title": title, "url": href})
-        except NoSuchElementException:
+    items: List[Article] = []
+    for raw in driver.execute_script(LIST_ITEMS_JS):
+        if raw["title"] is None or raw["date"] is None or not raw["url"]:
             continue
+        items.append(Article(date=raw["date"], title=raw["title"], url=normalize_url(raw["url"])))
     return items
 
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL, used as its identity in the database:
+    lower-case scheme and host, no fragment. The query string is kept because
+    it can be what identifies the announcement.
+    """
+    parts = urlparse(url)
+    return urlunparse(parts._replace(scheme=parts.scheme.lower(), netloc=parts.netloc.lower(), fragment=""))
+
 def goto_next_page(driver: webdriver.Chrome) -> bool:
     try:
         next_li = driver.find_element(By.ID, "next-toggle-id")
@@ -154,182 +326,456 @@ def goto_next_page(driver: webdriver.Chrome) -> bool:
 ## NEW: Database and Text Extraction Helpers
 # ────────────────────────────────────────────────────────────────────────────────
 
+def _pdftotext(filepath: Path) -> str:
+    """
+    Extracts PDF text with the `pdftotext` command-line tool from poppler-utils
+    (e.g. `apt install poppler-utils`), which must be on PATH.
+    """
+    result = subprocess.run(
+        ["pdftotext", "-layout", str(filepath), "-"],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout
+
 def extract_text_from_file(filepath: Path) -> str:
     """Extracts text from PDF, DOCX, or XLSX files."""
-    text = ""
+    # Collect pieces in a list and join once; repeated `+=` is quadratic.
+    parts: List[str] = []
     try:
         if filepath.suffix == '.pdf':
-            with open(filepath, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
+            try:
+                with pymupdf.open(filepath) as doc:
+                    for page in doc:
+                        parts.append(page.get_text("text"))
+            except Exception:
+                # Fall back to poppler's pdftotext for the rare PDFs MuPDF rejects.
+                # It is an optional system tool (poppler-utils); without it, report
+                # MuPDF's own error rather than a missing-binary one.
+                if shutil.which("pdftotext") is None:
+                    raise
+                parts = [_pdftotext(filepath)]
         elif filepath.suffix == '.docx':
             doc = docx.Document(filepath)
             for para in doc.paragraphs:
-                text += para.text + "\n"
+                parts.append(para.text)
         elif filepath.suffix == '.xlsx':
-            workbook = openpyxl.load_workbook(filepath)
-            for sheet in workbook.worksheets:
-                for row in sheet.iter_rows():
-                    for cell in row:
-                        if cell.value:
-                            text += str(cell.value) + " "
-                    text += "\n"
+            workbook = openpyxl.load_workbook(filepath, read_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    # values_only skips building a Cell object per value
+                    for row in sheet.iter_rows(values_only=True):
+                        parts.append(" ".join(str(v) for v in row if v is not None))
+            finally:
+                workbook.close()
     except Exception as e:
         return f"[Error extracting text from {filepath.name}: {e}]"
-    return text
+    return "\n".join(parts)
 
-def add_article_to_db(article_data: Dict[str, str]) -> bool:
+def add_article_to_db(conn: sqlite3.Connection, article_data: Dict[str, str]) -> None:
     """
-    Inserts a new article record into the database.
-    Returns True if added, False if it was a duplicate.
+    Queues a new article record for insertion. The queue is written to the
+    database every INSERT_BATCH_SIZE articles, or when flush_pending_articles
+    is called.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    _PENDING.append((
+        article_data['title'],
+        article_data['url'],
+        article_data['date'],
+        article_data['article_text'],
+        article_data['attachments_text']
+    ))
+    if len(_PENDING) >= INSERT_BATCH_SIZE:
+        flush_pending_articles(conn)
+
+def flush_pending_articles(conn: sqlite3.Connection) -> None:
+    """Inserts all queued articles in a single transaction."""
+    if not _PENDING:
+        return
     sql = """
-        INSERT INTO articles (
+        INSERT OR IGNORE INTO articles (
             title, url, publication_date, article_text, attachments_text
         ) VALUES (?, ?, ?, ?, ?);
     """
+    # OR IGNORE lets the UNIQUE(url) constraint silently drop duplicates.
     try:
-        cursor.execute(sql, (
-            article_data['title'],
-            article_data['url'],
-            article_data['date'],
-            article_data['article_text'],
-            article_data['attachments_text']
-        ))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        # This error occurs if the URL is not unique, which is what we want.
-        return False
+        before = conn.total_changes
+        with conn:
+            conn.executemany(sql, _PENDING)
+        print(f"  ✔ Saved {conn.total_changes - before} of {len(_PENDING)} queued articles to the database.")
+    except sqlite3.Error as e:
+        urls = [row[1] for row in _PENDING]
+        print(f"  ⚠ Database error saving {len(urls)} articles {urls}: {e}")
     finally:
-        conn.close()
+        _PENDING.clear()
+
+def load_known_urls(conn: sqlite3.Connection) -> Set[str]:
+    """
+    Returns the set of article URLs already stored in the database, so the
+    listing loop can skip them without opening the page. URLs are
+    normalized so rows stored before normalization still match.
+    """
+    return {normalize_url(row[0]) for row in conn.execute("SELECT url FROM articles")}
+
+def sanitize_name(name: str) -> str:
+    """Turns a URL path segment into a file name that is safe on any OS."""
+    if "%" in name:  # Only percent-encoded names need decoding
+        name = unquote(name)
+    return _WHITESPACE.sub("_", name.translate(_INVALID_CHARS)).strip("_") or "attachment"
+
+def _fetch_one(task: Tuple[str, Path]) -> Optional[Tuple[Path, str]]:
+    """
+    Streams a single attachment to disk. Returns its path and a status label,
+    or None on failure. Safe to call from several threads at once.
+    """
+    full_url, dest = task
+    try:
+        # For files we already have, ask the server to send the body only if it
+        # changed since we saved it; an unchanged file costs a bodiless 304.
+        headers = dict(_HTTP.headers)  # Passing headers replaces the pool defaults
+        if dest.exists():
+            headers["If-Modified-Since"] = formatdate(dest.stat().st_mtime, usegmt=True)
+
+        with _HTTP.request("GET", full_url, headers=headers, preload_content=False, timeout=30) as resp:
+            try:
+                if resp.status == 304:
+                    return dest, "Not modified"
+                if resp.status >= 400:
+                    raise urllib3.exceptions.HTTPError(f"HTTP {resp.status}")
+                # Write to a unique temp file first so a failed download never
+                # leaves a partial file that a later run would treat as up to date.
+                # A plain open() keeps the umask-derived mode (tempfile would force 0600),
+                # and "xb" refuses to reuse a name another writer already holds.
+                part = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:12]}.part")
+                try:
+                    with open(part, "xb") as f:
+                        shutil.copyfileobj(resp, f)
+                    os.replace(part, dest)
+                except BaseException:
+                    part.unlink(missing_ok=True)
+                    raise
+            finally:
+                resp.release_conn()
+        return dest, "Downloaded"
+    except Exception as e:
+        print(f"  ⚠ Failed to download {full_url}: {e}")
+        return None
+
+def attachment_dir(article: Article) -> Path:
+    """
+    Folder for one article's attachments: DOWNLOAD_DIR/<YYYY-MM-DD>/<title>_<url hash>.
+    The day comes from the article's own date, so re-runs on a different day land
+    in the same place; articles whose date can't be parsed go under "undated".
+    The URL hash keeps same-titled announcements from sharing a folder.
+    """
+    day = "undated"
+    date_str = article.date.split(" ", 1)[0]
+    for fmt in ARTICLE_DATE_FORMATS:
+        try:
+            day = datetime.strptime(date_str, fmt).strftime("%Y-%m-%d")
+            break
+        except ValueError:
+            continue
+    url_hash = hashlib.sha1(article.url.encode()).hexdigest()[:8]
+    folder = f"{sanitize_name(article.title)[:ARTICLE_DIR_NAME_MAX]}_{url_hash}"
+    dest_dir = DOWNLOAD_DIR / day / folder
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    return dest_dir
+
+def download_attachments(driver: webdriver.Chrome, article_url: str, dest_dir: Path) -> List[Path]:
+    """
+    Downloads every attachment linked from the current page in parallel.
+    Returns the paths of the files that were downloaded successfully, sorted.
+    """
+    # One script call returns every attachment link, already resolved to an absolute URL
+    hrefs = driver.execute_script(ATTACHMENT_LINKS_JS, list(_DL_EXTS))
+    return download_links(hrefs, article_url, dest_dir)
+
+def download_links(hrefs: List[str], article_url: str, dest_dir: Path) -> List[Path]:
+    """
+    Downloads the attachment links among `hrefs` into `dest_dir` in parallel.
+    Returns the paths of the files that were downloaded successfully, sorted.
+    """
+    tasks: Dict[str, Path] = {}  # URL -> destination, so each link is fetched once
+    for href in hrefs:
+        if not href or not urlparse(href).path.lower().endswith(_DL_EXTS):
+            continue
+
+        full_url = urljoin(article_url, href)
+        if full_url in tasks:
+            continue
+        filename = sanitize_name(os.path.basename(urlparse(full_url).path))
+        dest = dest_dir / filename
+        if dest in tasks.values():
+            # Different URL, same file name (e.g. en/report.pdf and ar/report.pdf)
+            url_hash = hashlib.sha1(full_url.encode()).hexdigest()[:8]
+            dest = dest.with_name(f"{dest.stem}_{url_hash}{dest.suffix}")
+        tasks[full_url] = dest
+
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as ex:
+        results = [r for r in ex.map(_fetch_one, tasks.items()) if r]
+
+    # Report once everything has finished so the output stays in a stable order
+    results.sort()
+    for dest, status in results:
+        print(f"  - {status}: {dest}")
+    return [dest for dest, _ in results]
 
 # ────────────────────────────────────────────────────────────────────────────────
 ## MODIFIED: Article Scraping Logic
 # ────────────────────────────────────────────────────────────────────────────────
 
-def scrape_article(driver: webdriver.Chrome, article_info: Dict[str, str]) -> None:
+def extract_attachments_text(paths: List[Path]) -> str:
+    """Extracts and labels the text of each downloaded attachment."""
+    # Parsing is CPU-bound, so it runs in worker processes, one file each.
+    extractions = [(dest, *_submit_parse(dest)) for dest in paths]
+    return "\n\n".join(
+        f"--- CONTENT FROM {dest.name} ---\n{_parse_result(dest, pool, fut)}"
+        for dest, pool, fut in extractions
+    )
+
+def _submit_parse(dest: Path) -> Tuple[ProcessPoolExecutor, Future]:
+    """Queues one file for parsing, replacing the pool first if it is already broken."""
+    pool = parse_pool()
+    try:
+        return pool, pool.submit(extract_text_from_file, dest)
+    except BrokenProcessPool:
+        _replace_broken_parse_pool(pool)
+        pool = parse_pool()
+        return pool, pool.submit(extract_text_from_file, dest)
+
+def _parse_result(dest: Path, pool: ProcessPoolExecutor, fut: Future) -> str:
     """
-    Opens an article, extracts all text from body and attachments,
-    and saves it to the database. Skips if URL is already in the DB.
+    Waits for one file's text. If a parse process died (e.g. MuPDF crashing on
+    a corrupt PDF, or the OOM killer), every file pending in that pool fails
+    with it, so the file is retried once in a fresh pool before it is recorded
+    as an error.
     """
-    print(f"\nProcessing: {article_info['title']}")
-
-    # 1. Open article in a new tab
-    parent_handle = driver.current_window_handle
-    driver.execute_script("window.open(arguments[0], '_blank');", article_info["url"])
-    WebDriverWait(driver, WAIT_SECS).until(EC.number_of_windows_to_be(2))
-    new_tab_handle = [h for h in driver.window_handles if h != parent_handle][0]
-    driver.switch_to.window(new_tab_handle)
+    try:
+        return fut.result()
+    except BrokenProcessPool:
+        _replace_broken_parse_pool(pool)
+    pool, fut = _submit_parse(dest)
+    try:
+        return fut.result()
+    except BrokenProcessPool as e:
+        _replace_broken_parse_pool(pool)
+        return f"[Error extracting text from {dest.name}: parser process died ({e})]"
 
+def scrape_article_http(article: Article, session: requests.Session = SESSION) -> Optional[Dict[str, str]]:
+    """
+    Fetches an article with a plain HTTP GET instead of a browser tab.
+    Returns the full record, or None if the page is blocked or has no
+    extractable body, in which case the caller should fall back to Selenium.
+    """
     try:
-        # Wait for page to load
-        WebDriverWait(driver, WAIT_SECS).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "main, body"))
-        )
+        resp = session.get(article.url, timeout=30)
+    except requests.RequestException as e:
+        print(f"  - HTTP fetch failed ({e}); falling back to the browser.")
+        return None
+    if resp.status_code != 200:
+        print(f"  - HTTP fetch returned {resp.status_code}; falling back to the browser.")
+        return None
+
+    # Raw bytes, not resp.text: requests falls back to ISO-8859-1 for text/html
+    # without a charset header, which garbles Arabic pages. Both parsers read the
+    # page's own <meta charset> when given bytes.
+    html = resp.content
+    tree = lxml.html.fromstring(html)
+    # Title plus visible body text; scripts may mention these phrases on real pages
+    visible = tree.xpath("//title//text() | //body//text()[not(ancestor::script or ancestor::style)]")
+    page_text = " ".join(visible).lower()
+    if any(marker in page_text for marker in BLOCKED_PAGE_MARKERS):
+        print("  - HTTP fetch got a block page; falling back to the browser.")
+        return None
+
+    article_text = trafilatura.extract(html, favor_precision=True)
+    if not article_text:
+        print("  - No article body in the raw HTML; falling back to the browser.")
+        return None
+
+    tree.make_links_absolute(article.url)
+    attachments = download_links(tree.xpath("//a/@href"), article.url, attachment_dir(article))
+
+    return {
+        **asdict(article),
+        "article_text": article_text,
+        "attachments_text": extract_attachments_text(attachments)
+    }
+
+def scrape_article(driver: webdriver.Chrome, article: Article) -> Dict[str, str]:
+    """
+    Opens an article, extracts all text from body and attachments,
+    and returns the full record ready to be saved to the database.
+    The driver belongs to a single article worker, so its one tab is
+    reused for every article rather than opening and closing a new one.
+    """
+    # 1. Navigate the worker's tab to the article
+    driver.get(article.url)
+    WebDriverWait(driver, WAIT_SECS).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "main, body"))
+    )
 
-        # 2. Extract main body text from the page
-        paragraphs = driver.find_elements(By.CSS_SELECTOR, "main p") or driver.find_elements(By.TAG_NAME, "p")
-        article_text = "\n".join(p.text.strip() for p in paragraphs if p.text.strip())
+    # 2. Extract main body text from the page
+    article_text = "\n".join(driver.execute_script(PARAGRAPHS_JS))
 
-        # 3. Download attachments and extract their text
-        attachments_text_parts = []
-        for a in driver.find_elements(By.CSS_SELECTOR, "a[href]"):
-            href = a.get_attribute("href")
-            if not href or not DL_EXT_PATTERN.search(href):
-                continue
+    # 3. Download attachments and extract their text
+    attachments = download_attachments(driver, article.url, attachment_dir(article))
 
-            full_url = urljoin(article_info["url"], href)
-            filename = unquote(os.path.basename(urlparse(full_url).path))
-            dest = DOWNLOAD_DIR / filename
+    # 4. Combine all data for the database writer
+    return {
+        **asdict(article),
+        "article_text": article_text,
+        "attachments_text": extract_attachments_text(attachments)
+    }
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Producer / consumer pipeline
+# ────────────────────────────────────────────────────────────────────────────────
+# The listing driver (producer) pages through results and queues new articles.
+# SCRAPE_WORKERS threads drain that queue, fetching each article over plain HTTP
+# and only falling back to their own headless Chrome when that fails. A single
+# writer thread saves the results, since SQLite allows only one writer.
+# A `None` on either queue tells its consumer to stop.
+
+def article_worker(headless: bool, articles: Queue, results: Queue) -> None:
+    """Scrapes queued articles until it receives None."""
+    driver: Optional[webdriver.Chrome] = None  # Started on the first fallback
+    try:
+        while True:
+            article = articles.get()
+            if article is None:
+                break
+            print(f"\nProcessing: {article.title}")
             try:
-                # Download the file
-                resp = requests.get(full_url, headers={"User-Agent": USER_AGENT}, timeout=45)
-                resp.raise_for_status()
-                dest.write_bytes(resp.content)
-                print(f"  - Downloaded: {dest}")
-
-                # Extract text from the downloaded file
-                file_text = extract_text_from_file(dest)
-                attachments_text_parts.append(f"--- CONTENT FROM {filename} ---\n{file_text}")
-
+                record = scrape_article_http(article)
+                if record is None:
+                    if driver is None:
+                        driver = build_driver(headless)
+                    record = scrape_article(driver, article)
+                results.put(record)
             except Exception as e:
-                print(f"  ⚠ Failed to download or process {full_url}: {e}")
-
-        # 4. Combine all data and save to database
-        full_article_data = {
-            **article_info,
-            "article_text": article_text,
-            "attachments_text": "\n\n".join(attachments_text_parts)
-        }
-
-        if add_article_to_db(full_article_data):
-            print("  ✔ Article is new. Added to the database.")
-        else:
-            print("  - Article already exists in the database. Skipped.")
+                print(f"  ⚠ Failed to scrape {article.url}: {e}")
+    finally:
+        if driver is not None:
+            driver.quit()
 
+def db_writer(conn: sqlite3.Connection, results: Queue) -> None:
+    """
+    Saves scraped articles until it receives None, then flushes the remainder.
+    PAGE_DONE flushes whatever is queued, so progress is saved once per listing page.
+    """
+    try:
+        while True:
+            article_data = results.get()
+            if article_data is None:
+                break
+            if article_data is PAGE_DONE:
+                flush_pending_articles(conn)
+                continue
+            add_article_to_db(conn, article_data)
+            print(f"  ✔ Article is new. Queued for the database: {article_data['title']}")
     finally:
-        # 5. Close the tab and switch back
-        driver.close()
-        driver.switch_to.window(parent_handle)
+        flush_pending_articles(conn)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Main logic
 # ────────────────────────────────────────────────────────────────────────────────
 
-def main(url: str, *, headless: bool = True, keep_open: bool = False) -> None:
+def main(url: str, *, headless: bool = True, keep_open: bool = False, num_workers: int = SCRAPE_WORKERS) -> None:
+    if num_workers < 1:
+        print(f"Error: at least one article worker is needed (got {num_workers}).")
+        sys.exit(1)
+
     # Check if database file exists. If not, ask user to run setup.
     if not Path(DATABASE_FILE).exists():
         print(f"Error: Database file '{DATABASE_FILE}' not found.")
         print("Please run the `database_setup.py` script first.")
         sys.exit(1)
 
+    # One connection for the whole run, instead of one per article. It is only
+    # used by the writer thread once the pipeline starts.
+    conn = configure_connection(sqlite3.connect(DATABASE_FILE, check_same_thread=False))
+    atexit.register(conn.close)
+    known_urls = load_known_urls(conn)
+
+    articles: Queue = Queue()
+    results: Queue = Queue()
+    writer = threading.Thread(target=db_writer, args=(conn, results), daemon=True)
+    workers = [
+        threading.Thread(target=article_worker, args=(headless, articles, results), daemon=True)
+        for _ in range(num_workers)
+    ]
+    writer.start()
+    for w in workers:
+        w.start()
+
     drv = build_driver(headless)
     try:
-        drv.get(url)
-        WebDriverWait(drv, WAIT_SECS).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        if "access denied" in drv.title.lower():
-            print("‼ Access denied — aborting.")
-            return
-
-        click_period(drv, "1D") # Click '1 Day' filter
-
-        page_no = 1
-        while True:
-            print(f"\n==== SCANNING LIST PAGE {page_no} ====")
-            articles_on_page = extract_list_items(drv)
-            if not articles_on_page:
-                print("No articles found on this page. Stopping.")
-                break
-
-            for art in articles_on_page:
-                scrape_article(drv, art) # Process each article
-
-            page_no += 1
-            if not goto_next_page(drv):
-                break
+        try:
+            # With the eager load strategy get() returns on DOMContentLoaded; the
+            # element waits in click_period/extract_list_items cover the rest.
+            drv.get(url)
+            if "access denied" in drv.title.lower():
+                print("‼ Access denied — aborting.")
+                return
+
+            click_period(drv, "1D") # Click '1 Day' filter
+
+            page_no = 1
+            while True:
+                print(f"\n==== SCANNING LIST PAGE {page_no} ====")
+                articles_on_page = extract_list_items(drv)
+                if not articles_on_page:
+                    print("No articles found on this page. Stopping.")
+                    break
+
+                for art in articles_on_page:
+                    if art.url in known_urls:
+                        print(f"  - Already in the database, skipped: {art.title}")
+                        continue
+                    known_urls.add(art.url)
+                    articles.put(art) # Hand off to the article workers
+                results.put(PAGE_DONE) # Save what the workers have finished so far
+
+                page_no += 1
+                if not goto_next_page(drv):
+                    break
+        finally:
+            # Let the workers drain the queue, then stop the writer
+            for _ in workers:
+                articles.put(None)
+            for w in workers:
+                w.join()
+            results.put(None)
+            writer.join()
 
         print("\n✔ Scraping process complete.")
         if keep_open:
             input("Press <Enter> to close browser…")
     finally:
         drv.quit()
+        shutdown_parse_pool()
+        SESSION.close()
+        _HTTP.clear()
 
 
 if __name__ == "__main__":
     DEFAULT_URL = "https://www.saudiexchange.sa/wps/portal/saudiexchange/newsandreports"
     show_ui = "--show" in sys.argv
     hold_open = "--keep" in sys.argv
+    # --workers=N sets how many articles are scraped in parallel
+    workers_arg = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--workers=")), None)
+    try:
+        num_workers = int(workers_arg) if workers_arg else SCRAPE_WORKERS
+    except ValueError:
+        print(f"Error: --workers expects a whole number, got '{workers_arg}'.")
+        sys.exit(1)
     # Find the first argument that is not an option (does not start with --)
     url_arg = next((arg for arg in sys.argv[1:] if not arg.startswith("--")), None)
     target_url = url_arg if url_arg else DEFAULT_URL
-    main(target_url, headless=not show_ui, keep_open=hold_open)
+    main(target_url, headless=not show_ui, keep_open=hold_open, num_workers=num_workers)
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
\ No newline at end of file